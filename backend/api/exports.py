@@ -0,0 +1,142 @@
+import csv
+import hashlib
+import json
+import time
+from io import BytesIO
+
+from api.metrics import PDF_RENDER_TIME
+from api.utils import pdf_generate
+from django.conf import settings
+from django.core.cache import cache
+from django.http import (HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+from django.utils.http import parse_etags
+
+
+class Echo:
+    """File-like object that returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListExporter:
+    """Base shopping list exporter streaming aggregated ingredients."""
+
+    format = None
+    content_type = None
+    filename = 'shopping_list'
+
+    def __init__(self, ingredients):
+        self.ingredients = ingredients
+
+    def rows(self):
+        for value in self.ingredients.iterator():
+            yield (
+                value['ingredient__name'],
+                value['amount__sum'],
+                value['ingredient__measurement_unit'],
+            )
+
+    def stream(self):
+        raise NotImplementedError
+
+    def get_response(self, request):
+        response = StreamingHttpResponse(
+            self.stream(),
+            content_type=self.content_type
+        )
+        return self.add_disposition(response)
+
+    def add_disposition(self, response):
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.filename}.{self.format}"'
+        )
+        return response
+
+
+class TextExporter(ShoppingListExporter):
+    """Plain text shopping list, one ingredient per line."""
+
+    format = 'txt'
+    content_type = 'text/plain; charset=utf-8'
+
+    def stream(self):
+        for name, amount, unit in self.rows():
+            yield f'{name} - {amount} {unit}\n'
+
+
+class CsvExporter(ShoppingListExporter):
+    """CSV shopping list with a header row."""
+
+    format = 'csv'
+    content_type = 'text/csv; charset=utf-8'
+
+    def stream(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'amount', 'measurement_unit'))
+        for row in self.rows():
+            yield writer.writerow(row)
+
+
+class JsonExporter(ShoppingListExporter):
+    """JSON array of ingredients written item by item."""
+
+    format = 'json'
+    content_type = 'application/json'
+
+    def stream(self):
+        separator = ''
+        yield '['
+        for name, amount, unit in self.rows():
+            yield separator + json.dumps({
+                'name': name,
+                'amount': amount,
+                'measurement_unit': unit,
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']'
+
+
+class PdfExporter(ShoppingListExporter):
+    """PDF shopping list rendered with ReportLab."""
+
+    format = 'pdf'
+    content_type = 'application/pdf'
+
+    def stream(self):
+        for name, amount, unit in self.rows():
+            yield f'{name} - {amount} {unit}<br />'
+
+    def render(self, text):
+        started = time.perf_counter()
+        buffer = BytesIO()
+        pdf_generate(text, buffer)
+        PDF_RENDER_TIME.observe(time.perf_counter() - started)
+        return buffer.getvalue()
+
+    def get_response(self, request):
+        """Serve the PDF from a cache keyed by the list contents."""
+        text = ''.join(self.stream())
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        etag = f'"{digest}"'
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        key = f'shopping_list:{self.format}:{digest}'
+        content = cache.get(key)
+        if content is None:
+            content = self.render(text)
+            cache.set(key, content, settings.SHOPPING_LIST_CACHE_TIMEOUT)
+        response = HttpResponse(content, content_type=self.content_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return self.add_disposition(response)
+
+
+EXPORTERS = {
+    exporter.format: exporter
+    for exporter in (PdfExporter, TextExporter, CsvExporter, JsonExporter)
+}
@@ -0,0 +1,91 @@
+import base64
+import binascii
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+
+class RecipeImageField(serializers.ImageField):
+    """Image sent as a multipart upload or as a base64 data URI.
+
+    Base64 data is decoded chunk by chunk into a temporary file, and the
+    image size and dimensions are checked before any pixels are decoded.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    EXTENSIONS = {
+        'JPEG': 'jpg',
+        'PNG': 'png',
+        'GIF': 'gif',
+        'WEBP': 'webp',
+    }
+    default_error_messages = {
+        'invalid_base64': 'The image is not valid base64 data.',
+        'too_large': 'The image must not exceed {max_size} bytes.',
+        'too_many_pixels': (
+            'The image must not exceed {max_dimension} pixels per side.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = self.decode(data)
+        elif not hasattr(data, 'size'):
+            self.fail('invalid')
+        try:
+            if data.size > settings.RECIPE_IMAGE_MAX_SIZE:
+                self.fail(
+                    'too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE
+                )
+            self.check_header(data)
+            return super().to_internal_value(data)
+        except serializers.ValidationError:
+            # A rejected upload is never read again.
+            data.close()
+            raise
+
+    def decode(self, data):
+        header, _, encoded = data.rpartition(';base64,')
+        # Every 4 base64 characters hold 3 bytes.
+        if len(encoded) // 4 * 3 > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+
+        file = TemporaryUploadedFile(
+            name=str(uuid.uuid4()),
+            content_type=header.replace('data:', '') or None,
+            size=0,
+            charset=None
+        )
+        try:
+            for start in range(0, len(encoded), self.CHUNK_SIZE):
+                file.write(base64.b64decode(
+                    encoded[start:start + self.CHUNK_SIZE], validate=True
+                ))
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_base64')
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def check_header(self, file):
+        """Reject unknown formats and huge images reading only the header."""
+        try:
+            with Image.open(file) as image:
+                image_format = image.format
+                width, height = image.size
+        except (OSError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        finally:
+            file.seek(0)
+
+        if image_format not in self.EXTENSIONS:
+            self.fail('invalid_image')
+        max_dimension = settings.RECIPE_IMAGE_MAX_DIMENSION
+        if width > max_dimension or height > max_dimension:
+            self.fail('too_many_pixels', max_dimension=max_dimension)
+        if isinstance(file, TemporaryUploadedFile) and '.' not in file.name:
+            file.name = f'{file.name}.{self.EXTENSIONS[image_format]}'
@@ -5,7 +5,7 @@ from recipes.models import Recipes, Tag
 
 
 class RecipesFilter(FilterSet):
-    """Filtering by author, tag, favorite, and added to cart."""
+    """Filtering by author, tag, favorite, added to cart and text search."""
 
     author = filters.CharFilter(
         field_name='author__id',
@@ -21,6 +21,9 @@ class RecipesFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='cart_filter'
     )
+    search = filters.CharFilter(
+        method='search_filter'
+    )
 
     def favorited_filter(self, queryset, name, value):
         if value:
@@ -32,6 +35,9 @@ class RecipesFilter(FilterSet):
             return queryset.filter(cart__author=self.request.user)
         return queryset
 
+    def search_filter(self, queryset, name, value):
+        return queryset.search(value)
+
     class Meta:
         model = Recipes
         fields = ('tags', 'author', 'is_favorited')
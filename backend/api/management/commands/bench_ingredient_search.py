@@ -0,0 +1,58 @@
+import time
+
+from api.search import ingredient_index
+from api.serializers import IngredientsSerializer
+from django.core.management.base import BaseCommand
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Compare ingredient autocomplete through the ORM and the index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            default=3,
+            type=int,
+            help='How many times to run every prefix')
+
+    def handle(self, *args, **options):
+        names = Ingredient.objects.values_list('name', flat=True)
+        prefixes = sorted({
+            name[:length]
+            for name in names
+            for length in (1, 2, 3)
+            if len(name) >= length
+        })
+        if not prefixes:
+            self.stdout.write('No ingredients to search, run import_to_db')
+            return
+
+        ingredient_index.refresh()
+        timings = {}
+        for label, search in (
+            ('orm', self.search_orm),
+            ('index', ingredient_index.search),
+        ):
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                for prefix in prefixes:
+                    search(prefix)
+            timings[label] = time.perf_counter() - start
+
+        calls = len(prefixes) * options['repeat']
+        for label, total in timings.items():
+            self.stdout.write(
+                f'{label}: {calls} searches, {total:.3f}s total, '
+                f'{total / calls * 1000:.3f}ms per search'
+            )
+        self.stdout.write(
+            f'index speedup: x{timings["orm"] / timings["index"]:.1f}'
+        )
+
+    @staticmethod
+    def search_orm(prefix):
+        return IngredientsSerializer(
+            Ingredient.objects.filter(name__istartswith=prefix),
+            many=True
+        ).data
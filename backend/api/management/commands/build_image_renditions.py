@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from recipes.images import build_renditions
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = 'Build missing image renditions of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild renditions of every recipe')
+
+    def handle(self, *args, **options):
+        recipes = Recipes.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_renditions={})
+        built = 0
+        for recipe_id, image in recipes.values_list('id', 'image').iterator():
+            try:
+                build_renditions(recipe_id, image)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{recipe_id} {image}: {error}')
+                continue
+            built += 1
+        self.stdout.write(f'Recipes with built renditions: {built}')
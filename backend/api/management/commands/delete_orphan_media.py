@@ -0,0 +1,54 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = 'Delete recipe images no recipe refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            default=settings.MEDIA_ORPHAN_MIN_AGE,
+            type=int,
+            help='Keep files younger than this many seconds')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the files that would be deleted')
+
+    def handle(self, *args, **options):
+        referenced = set()
+        recipes = Recipes.objects.values_list('image', 'image_renditions')
+        for image, renditions in recipes.iterator():
+            referenced.add(image)
+            referenced.update(renditions.values())
+
+        # Young files may belong to uploads that are not committed yet.
+        threshold = timezone.now() - timedelta(seconds=options['min_age'])
+        deleted = 0
+        for name in self.walk('recipes'):
+            if name in referenced:
+                continue
+            if default_storage.get_modified_time(name) > threshold:
+                continue
+            self.stdout.write(name)
+            if not options['dry_run']:
+                default_storage.delete(name)
+            deleted += 1
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f'{action} orphan files: {deleted}')
+
+    def walk(self, directory):
+        if not default_storage.exists(directory):
+            return
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name)
+        for name in directories:
+            yield from self.walk(os.path.join(directory, name))
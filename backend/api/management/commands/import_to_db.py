@@ -1,14 +1,52 @@
+import csv
 import json
 import os
 
+from api.versions import bump_table_version
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.utils import IntegrityError
+from django.db import transaction
 from recipes.models import Ingredient
 
 
+def read_json(file, chunk_size=64 * 1024):
+    """Yield the objects of a JSON array one by one."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('JSON file must contain an array')
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if buffer[position:position + 1] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValueError('Unexpected end of JSON file')
+            buffer = buffer[position:] + chunk
+            position = 0
+        else:
+            yield item
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+READERS = {
+    '.json': read_json,
+    '.csv': read_csv,
+}
+
+
 class Command(BaseCommand):
-    help = 'Import ingredients to DB from json'
+    help = 'Import ingredients to DB from json or csv'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -16,21 +54,64 @@ class Command(BaseCommand):
             default='ingredients.json',
             nargs='?',
             type=str)
+        parser.add_argument(
+            '--batch-size',
+            default=1000,
+            type=int,
+            help='Number of ingredients written per INSERT')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be imported without writing')
 
     def handle(self, *args, **options):
-        try:
-            with open(os.path.join(
-                settings.MEDIA_ROOT + '/data/', options['ingredients']), 'r',
-                    encoding='utf-8') as f:
-                data = json.load(f)
-                for ingredient in data:
-                    try:
-                        Ingredient.objects.create(name=ingredient['name'],
-                                                  measurement_unit=ingredient[
-                                                      'measurement_unit'])
-                    except IntegrityError:
-                        print(f'The database already has: {ingredient["name"]}'
-                              f'({ingredient["measurement_unit"]})')
+        path = os.path.join(
+            settings.MEDIA_ROOT, 'data', options['ingredients']
+        )
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError('Only .json and .csv files can be imported')
 
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                with transaction.atomic():
+                    inserted, skipped = self.import_ingredients(
+                        reader(file), options
+                    )
+                    if inserted and not options['dry_run']:
+                        # bulk_create does not send post_save.
+                        bump_table_version(Ingredient)
         except FileNotFoundError:
             raise CommandError('File is not in the directory media/data')
+        except (ValueError, IndexError, KeyError) as error:
+            raise CommandError(f'Malformed file: {error}')
+
+        action = 'Would insert' if options['dry_run'] else 'Inserted'
+        self.stdout.write(f'{action}: {inserted}, skipped: {skipped}')
+
+    def import_ingredients(self, rows, options):
+        seen = set(Ingredient.objects.values_list('name', flat=True))
+        batch = []
+        inserted = skipped = 0
+        for row in rows:
+            name = row['name'].strip()
+            if not name or name in seen:
+                skipped += 1
+                continue
+            seen.add(name)
+            batch.append(Ingredient(
+                name=name,
+                measurement_unit=row['measurement_unit'].strip()
+            ))
+            if len(batch) >= options['batch_size']:
+                inserted += self.write(batch, options)
+                batch = []
+        if batch:
+            inserted += self.write(batch, options)
+        return inserted, skipped
+
+    def write(self, batch, options):
+        if not options['dry_run']:
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f'Processed batch of {len(batch)} ingredients')
+        return len(batch)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = 'Recalculate favorites_count and carts_count of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report recipes with wrong counters')
+
+    def handle(self, *args, **options):
+        drifted = list(Recipes.objects.annotate(
+            actual_favorites=Count('favorite', distinct=True),
+            actual_carts=Count('cart', distinct=True),
+        ).exclude(
+            favorites_count=F('actual_favorites'),
+            carts_count=F('actual_carts'),
+        ).only('id', 'name', 'favorites_count', 'carts_count'))
+
+        for recipe in drifted:
+            self.stdout.write(
+                f'{recipe.id} {recipe.name}: '
+                f'favorites {recipe.favorites_count} -> '
+                f'{recipe.actual_favorites}, '
+                f'carts {recipe.carts_count} -> {recipe.actual_carts}'
+            )
+            recipe.favorites_count = recipe.actual_favorites
+            recipe.carts_count = recipe.actual_carts
+
+        if not options['dry_run']:
+            Recipes.objects.bulk_update(
+                drifted, ('favorites_count', 'carts_count'), batch_size=500
+            )
+        self.stdout.write(f'Recipes with drifted counters: {len(drifted)}')
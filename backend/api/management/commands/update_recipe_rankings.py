@@ -0,0 +1,85 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from api.versions import bump_table_version
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from recipes.models import Cart, Favorite, RecipeRanking
+
+
+FAVORITE_WEIGHT = 2
+CART_WEIGHT = 1
+
+
+class Command(BaseCommand):
+    help = 'Update popularity scores of recipes from favorites and carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild all scores from the activity in the window')
+
+    def decay(self, age):
+        half_life = timedelta(days=settings.POPULAR_RECIPES_HALF_LIFE_DAYS)
+        return 0.5 ** (age / half_life)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        now = timezone.now()
+        window = timedelta(days=settings.POPULAR_RECIPES_WINDOW_DAYS)
+        last_run = RecipeRanking.objects.aggregate(
+            Max('computed_at')
+        )['computed_at__max']
+
+        if options['full'] or last_run is None:
+            RecipeRanking.objects.all().delete()
+            since = now - window
+        else:
+            # Scores only decay between runs, new activity is added on top.
+            since = last_run
+            RecipeRanking.objects.update(
+                score=F('score') * self.decay(now - last_run),
+                computed_at=now
+            )
+
+        scores = defaultdict(float)
+        for model, weight in ((Favorite, FAVORITE_WEIGHT),
+                              (Cart, CART_WEIGHT)):
+            events = model.objects.filter(
+                created__gt=since,
+                created__lte=now
+            ).values_list('recipe_id', 'created')
+            for recipe_id, created in events.iterator():
+                scores[recipe_id] += weight * self.decay(now - created)
+
+        rankings = RecipeRanking.objects.in_bulk(scores)
+        for recipe_id, score in scores.items():
+            if recipe_id in rankings:
+                rankings[recipe_id].score += score
+        RecipeRanking.objects.bulk_update(
+            rankings.values(), ('score',), batch_size=500
+        )
+        RecipeRanking.objects.bulk_create(
+            (
+                RecipeRanking(recipe_id=recipe_id, score=score,
+                              computed_at=now)
+                for recipe_id, score in scores.items()
+                if recipe_id not in rankings
+            ),
+            batch_size=500
+        )
+
+        # Drop recipes whose activity has all left the window.
+        removed, _ = RecipeRanking.objects.filter(
+            score__lt=CART_WEIGHT * self.decay(window)
+        ).delete()
+        # Bulk writes send no signals; cached /popular/ counts depend on it.
+        bump_table_version(RecipeRanking)
+        self.stdout.write(
+            f'Recipes with new activity: {len(scores)}, '
+            f'removed from ranking: {removed}'
+        )
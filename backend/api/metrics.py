@@ -0,0 +1,207 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Metric:
+    """Base metric keeping one value per label set."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def labels_key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        registry.add(self, (self.labels_key(labels),), amount)
+
+    def samples(self, values):
+        for (key,), value in sorted(values.items()):
+            yield self.name, self.labelnames, key, value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.labels_key(labels)
+        bucket = bisect_left(self.buckets, value)
+        le = (
+            str(self.buckets[bucket]) if bucket < len(self.buckets)
+            else '+Inf'
+        )
+        registry.add(self, (key, le), 1)
+        registry.add(self, (key, 'sum'), value)
+
+    def samples(self, values):
+        bucket_labels = self.labelnames + ('le',)
+        for key in sorted({key for key, _ in values}):
+            total = 0
+            for le in tuple(map(str, self.buckets)) + ('+Inf',):
+                total += values.get((key, le), 0)
+                yield self.name + '_bucket', bucket_labels, key + (le,), total
+            yield (
+                self.name + '_sum', self.labelnames, key,
+                values.get((key, 'sum'), 0)
+            )
+            yield self.name + '_count', self.labelnames, key, total
+
+
+class Registry:
+    """Metric values of this process.
+
+    With METRICS_MULTIPROCESS_DIR set, the values are written to a file
+    per process at most every METRICS_FLUSH_INTERVAL seconds, and
+    collecting sums the files of all gunicorn workers.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.values = {}
+        self.lock = threading.Lock()
+        # Serializes flushes, the threads of a process share its file.
+        self.file_lock = threading.Lock()
+        self.flushed = 0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add(self, metric, key, amount):
+        with self.lock:
+            values = self.values.setdefault(metric.name, {})
+            values[key] = values.get(key, 0) + amount
+
+    def path(self):
+        directory = settings.METRICS_MULTIPROCESS_DIR
+        if directory:
+            return os.path.join(directory, f'{os.getpid()}.json')
+        return None
+
+    def flush(self, force=False):
+        path = self.path()
+        now = time.monotonic()
+        if path is None or (
+            not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        # The snapshot is taken under file_lock too, so an older one is
+        # never written over a newer one.
+        with self.file_lock:
+            with self.lock:
+                data = {
+                    name: [[list(key), value] for key, value in values.items()]
+                    for name, values in self.values.items()
+                }
+                self.flushed = now
+            # Readers must never see a half written file.
+            temporary = f'{path}.tmp'
+            with open(temporary, 'w') as file:
+                json.dump(data, file)
+            os.replace(temporary, path)
+
+    def collect(self):
+        """Values of every metric summed over all processes."""
+        path = self.path()
+        if path is None:
+            with self.lock:
+                return {
+                    name: dict(values)
+                    for name, values in self.values.items()
+                }
+        self.flush(force=True)
+        merged = {}
+        pattern = os.path.join(settings.METRICS_MULTIPROCESS_DIR, '*.json')
+        for filename in glob.glob(pattern):
+            try:
+                with open(filename) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, items in data.items():
+                values = merged.setdefault(name, {})
+                for key, value in items:
+                    key = tuple(
+                        tuple(part) if isinstance(part, list) else part
+                        for part in key
+                    )
+                    values[key] = values.get(key, 0) + value
+        return merged
+
+    def exposition(self):
+        """Metrics in the Prometheus text format."""
+        collected = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            samples = metric.samples(collected.get(name, {}))
+            for sample, labelnames, key, value in samples:
+                labels = ','.join(
+                    '{}="{}"'.format(label, escape(label_value))
+                    for label, label_value in zip(labelnames, key)
+                )
+                lines.append(
+                    f'{sample}{{{labels}}} {value}' if labels
+                    else f'{sample} {value}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds',
+    'Request latency by view.',
+    ('view', 'method'),
+))
+REQUESTS = registry.register(Counter(
+    'http_requests_total',
+    'Requests by view and status.',
+    ('view', 'method', 'status'),
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    'db_queries_per_request',
+    'SQL queries run by a request.',
+    ('view',),
+    buckets=QUERY_BUCKETS,
+))
+REQUEST_DB_TIME = registry.register(Histogram(
+    'db_duration_seconds',
+    'Time a request spent in SQL queries.',
+    ('view',),
+))
+PDF_RENDER_TIME = registry.register(Histogram(
+    'shopping_list_pdf_render_seconds',
+    'Time to render a shopping list PDF.',
+))
@@ -0,0 +1,166 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from api.metrics import (REQUEST_DB_TIME, REQUEST_LATENCY, REQUEST_QUERIES,
+                         REQUESTS, registry)
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger('api.requests')
+
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+
+def get_view_name(request, view_func):
+    """Name a view as ``ViewSet.action`` or ``View`` for plain views."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        match = request.resolver_match
+        return match.view_name if match else view_func.__name__
+    action = (getattr(view_func, 'actions', None) or {}).get(
+        request.method.lower()
+    )
+    if action:
+        return f'{view_class.__name__}.{action}'
+    return view_class.__name__
+
+
+class RequestStats:
+    """Queries, database time and SQL shapes of one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+        self.view_name = None
+        self.view_started = None
+        self.view_finished = None
+        self.view_db_time = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            # Parameters are placeholders already, only IN lists vary.
+            self.shapes[IN_LIST.sub('(%s)', sql)] += 1
+
+    def start_view(self, view_name):
+        self.view_name = view_name
+        self.view_started = time.perf_counter()
+        self.view_db_time = self.db_time
+
+    def finish_view(self):
+        self.view_finished = time.perf_counter()
+        self.view_db_time = self.db_time - self.view_db_time
+
+    def repeated_shapes(self):
+        threshold = settings.REQUEST_STATS_REPEATED_QUERY_THRESHOLD
+        return [
+            (sql, count) for sql, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+class RequestStatsMiddleware:
+    """Report queries, database time, view and render time per view.
+
+    The numbers are sent in the ``Server-Timing`` header and logged as a
+    JSON line. Requests repeating the same SQL are logged as warnings,
+    which is how N+1 queries show up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.stats = stats = RequestStats()
+        started = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        if stats.view_name is None:
+            return response
+        if stats.view_finished is None:
+            stats.finish_view()
+        finished = time.perf_counter()
+
+        view_time = (
+            stats.view_finished - stats.view_started - stats.view_db_time
+        )
+        render_time = finished - stats.view_finished
+        timings = (
+            ('db', stats.db_time, f'queries: {stats.queries}'),
+            ('view', view_time, 'view and serializers without db'),
+            ('render', render_time, 'response rendering'),
+            ('total', finished - started, None),
+        )
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            + (f';desc="{description}"' if description else '')
+            for name, duration, description in timings
+        )
+
+        record = {
+            'view': stats.view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'size': (
+                None if response.streaming else len(response.content)
+            ),
+        }
+        record.update(
+            (f'{name}_ms', round(duration * 1000, 1))
+            for name, duration, _ in timings
+        )
+        repeated = stats.repeated_shapes()
+        if repeated:
+            record['repeated_queries'] = [
+                {'sql': sql, 'count': count} for sql, count in repeated
+            ]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.stats.start_view(get_view_name(request, view_func))
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook.
+        request.stats.finish_view()
+        return response
+
+
+class MetricsMiddleware:
+    """Record latency, status and queries of each request for /metrics.
+
+    Must come before RequestStatsMiddleware, whose stats it reads.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        stats = getattr(request, 'stats', None)
+        view = stats.view_name if stats and stats.view_name else 'unknown'
+        REQUEST_LATENCY.observe(duration, view=view, method=request.method)
+        REQUESTS.inc(
+            view=view, method=request.method, status=response.status_code
+        )
+        if stats is not None:
+            REQUEST_QUERIES.observe(stats.queries, view=view)
+            REQUEST_DB_TIME.observe(stats.db_time, view=view)
+        registry.flush()
+        return response
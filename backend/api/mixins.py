@@ -1,4 +1,10 @@
-from rest_framework import mixins, viewsets
+import hashlib
+
+from api.versions import get_table_version
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import mixins, status, viewsets
+from rest_framework.response import Response
 
 
 class ViewOnlyViewSet(
@@ -6,5 +12,43 @@ class ViewOnlyViewSet(
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet
 ):
-    """Viewset to handle GET requests only."""
+    """Viewset to handle GET requests only.
+
+    Responses carry an ETag derived from the table version, so unchanged
+    reference data is answered with 304 without being serialized.
+    """
     pagination_class = None
+
+    def get_etag(self, request):
+        version = get_table_version(self.get_queryset().model)
+        key = ':'.join((
+            str(version),
+            request.accepted_media_type,
+            request.get_full_path()
+        ))
+        return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Caches must revalidate: the ETag is cheap to check, and a
+            # max-age would let them serve data edited in the meantime.
+            patch_cache_control(response, public=True, no_cache=True)
+            patch_vary_headers(response, ('Accept',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
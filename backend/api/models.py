@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class TableVersion(models.Model):
+    """Change counter of a table, shared by all processes."""
+
+    name = models.CharField(
+        'Table',
+        max_length=100,
+        primary_key=True,
+    )
+    version = models.PositiveBigIntegerField(
+        'Version',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Table version'
+        verbose_name_plural = 'Table versions'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
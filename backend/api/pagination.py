@@ -0,0 +1,169 @@
+import hashlib
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from api.versions import get_table_versions
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from recipes.models import RecipeRanking
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator that caches the total count for a short time.
+
+    Counts are cached per filter and per version of the tables listed in
+    count_models. Large unfiltered tables use the PostgreSQL row estimate.
+    """
+
+    count_models = ()
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        estimate = self.estimate_count(queryset)
+        if estimate is not None:
+            return estimate
+        versions = get_table_versions(queryset.model, *self.count_models)
+        key = 'pagination_count:' + hashlib.md5(
+            f'{versions}:{self.count_query(queryset)}'.encode()
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGINATION_COUNT_TIMEOUT)
+        return count
+
+    @staticmethod
+    def count_query(queryset):
+        """The query without annotations and ordering.
+
+        Per-user annotations such as is_favorited do not change the
+        count, so users share the cached count of the same filters.
+        """
+        query = queryset.query.chain()
+        query.set_annotation_mask(())
+        query.clear_ordering(True)
+        return query
+
+    @staticmethod
+    def estimate_count(queryset):
+        connection = connections[queryset.db]
+        query = queryset.query
+        if (connection.vendor != 'postgresql' or query.where
+                or query.distinct or query.is_sliced):
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < settings.PAGINATION_ESTIMATE_THRESHOLD:
+            return None
+        return row[0]
+
+
+class RecipesPaginator(CachedCountPaginator):
+    """Recipe counts also depend on the ranking."""
+
+    count_models = (RecipeRanking,)
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Page number pagination with cached counts."""
+
+    django_paginator_class = CachedCountPaginator
+
+
+class FeedKeysetPagination(BasePagination):
+    """Keyset pagination over (pub_date, id), newest first.
+
+    Every page is a single indexed range query; no OFFSET and no COUNT.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    page_size = api_settings.PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        queryset = queryset.order_by('-pub_date', '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            pub_date, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            )
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def decode_cursor(self, cursor):
+        try:
+            pub_date, pk = b64decode(cursor.encode()).decode().split(' ')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def encode_cursor(self, recipe):
+        position = f'{recipe.pub_date.isoformat()} {recipe.id}'
+        return b64encode(position.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class RecipesPagination(CachedCountPagination):
+    """Page number pagination with an opt-in keyset mode.
+
+    On the feed, ?pagination=cursor switches to FeedKeysetPagination;
+    following pages are requested through the returned next link.
+    Querysets with their own ordering, such as ranked search results,
+    cannot be walked by (pub_date, id) and keep page numbers.
+    """
+
+    mode_query_param = 'pagination'
+    keyset_class = FeedKeysetPagination
+    django_paginator_class = RecipesPaginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                and getattr(view, 'action', 'list') == 'list'
+                and not queryset.query.order_by):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,129 @@
+import threading
+from bisect import bisect_left
+
+from api.versions import get_table_version
+from django.db import connection
+from recipes.models import Ingredient
+
+
+# Same default as pg_trgm.similarity_threshold.
+SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(value):
+    """Word trigrams padded the way pg_trgm pads them."""
+    result = set()
+    for word in value.split():
+        padded = f'  {word} '
+        result.update(
+            padded[i:i + 3] for i in range(len(padded) - 2)
+        )
+    return result
+
+
+def similarity(first, second):
+    if not first or not second:
+        return 0
+    return len(first & second) / len(first | second)
+
+
+class IngredientIndex:
+    """Process-local sorted prefix index over ingredient names."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ([], [], [])
+
+    def _build(self, version):
+        rows = sorted(
+            (name.casefold(), {
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            })
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        self._index = (
+            [key for key, _ in rows],
+            [item for _, item in rows],
+            [trigrams(key) for key, _ in rows],
+        )
+        self._version = version
+
+    def refresh(self):
+        version = get_table_version(Ingredient)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version)
+
+    def search(self, prefix):
+        """Ingredients whose names start with prefix, best matches first."""
+        self.refresh()
+        keys, items, _ = self._index
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = start
+        while end < len(keys) and keys[end].startswith(prefix):
+            end += 1
+        return sorted(
+            items[start:end],
+            key=lambda item: (len(item['name']), item['name'])
+        )
+
+    def fuzzy_search(self, query, limit):
+        """Prefix matches, then substring matches, then similar names."""
+        results = self.search(query)[:limit]
+        keys, items, _ = self._index
+        query = query.casefold()
+        seen = {item['id'] for item in results}
+
+        if len(results) < limit:
+            substring = sorted(
+                (key.find(query), len(key), key, item)
+                for key, item in zip(keys, items)
+                if item['id'] not in seen and query in key
+            )
+            results.extend(
+                item for *_, item in substring[:limit - len(results)]
+            )
+            seen.update(item['id'] for item in results)
+
+        if len(results) < limit:
+            results.extend(self.similar(query, seen, limit - len(results)))
+        return results
+
+    def similar(self, query, exclude, limit):
+        """Names similar to the query by trigrams, most similar first."""
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import TrigramSimilarity
+
+            return list(
+                Ingredient.objects.filter(
+                    name__trigram_similar=query
+                ).exclude(
+                    id__in=exclude
+                ).annotate(
+                    similarity=TrigramSimilarity('name', query)
+                ).order_by(
+                    '-similarity', 'name'
+                ).values('id', 'name', 'measurement_unit')[:limit]
+            )
+
+        query_trigrams = trigrams(query)
+        keys, items, key_trigrams = self._index
+        scored = []
+        for key, item, grams in zip(keys, items, key_trigrams):
+            if item['id'] in exclude:
+                continue
+            score = similarity(query_trigrams, grams)
+            if score >= SIMILARITY_THRESHOLD:
+                scored.append((-score, key, item))
+        scored.sort(key=lambda row: row[:2])
+        return [item for *_, item in scored[:limit]]
+
+
+ingredient_index = IngredientIndex()
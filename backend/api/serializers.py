@@ -1,7 +1,11 @@
+import json
+
+from api.fields import RecipeImageField
 from django.db import transaction
-from drf_extra_fields.fields import Base64ImageField
+from django.db.models import prefetch_related_objects
+from recipes.images import rendition_url, schedule_renditions
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipes,
-                            Tag)
+                            RecipesQuerySet, Tag)
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 from rest_framework.validators import UniqueTogetherValidator
@@ -75,6 +79,20 @@ class IngredientWriteSerializer(serializers.ModelSerializer):
         return data
 
 
+class ImageRenditionField(serializers.ReadOnlyField):
+    """URL of a resized copy of the recipe image."""
+
+    def __init__(self, rendition, **kwargs):
+        self.rendition = rendition
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return rendition_url(
+            recipe, self.rendition, self.context.get('request')
+        )
+
+
 class RecipesSerializer(serializers.ModelSerializer):
     """Recipes serializer."""
 
@@ -96,16 +114,32 @@ class RecipesSerializer(serializers.ModelSerializer):
         read_only=True,
         method_name='get_is_in_shopping_cart'
     )
+    image = serializers.SerializerMethodField(read_only=True)
+
+    def get_image(self, recipe):
+        view = self.context.get('view')
+        rendition = (
+            'full' if getattr(view, 'action', None) == 'retrieve' else 'card'
+        )
+        return rendition_url(recipe, rendition, self.context.get('request'))
 
     def get_is_favorited(self, recipe):
         user = self.context['request'].user
-        return (not user.is_anonymous
-                and recipe.favorite.filter(author=user).exists())
+        if user.is_anonymous:
+            return False
+        annotated = getattr(recipe, 'is_favorited', None)
+        if annotated is not None:
+            return annotated
+        return recipe.favorite.filter(author=user).exists()
 
     def get_is_in_shopping_cart(self, recipe):
         user = self.context['request'].user
-        return (not user.is_anonymous
-                and recipe.cart.filter(author=user).exists())
+        if user.is_anonymous:
+            return False
+        annotated = getattr(recipe, 'is_in_shopping_cart', None)
+        if annotated is not None:
+            return annotated
+        return recipe.cart.filter(author=user).exists()
 
     class Meta:
         fields = (
@@ -123,9 +157,24 @@ class RecipesSerializer(serializers.ModelSerializer):
         model = Recipes
 
 
+class RecipesCoverageSerializer(RecipesSerializer):
+    """Recipes serializer with the share of available ingredients."""
+
+    coverage = serializers.FloatField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipesSerializer.Meta):
+        fields = RecipesSerializer.Meta.fields + (
+            'coverage',
+            'missing_count',
+        )
+
+
 class RecipeSmallSerializer(serializers.ModelSerializer):
     """Serializer to display a list of recipes in subscriptions."""
 
+    image = ImageRenditionField('thumbnail')
+
     class Meta:
         fields = (
             'id',
@@ -148,7 +197,7 @@ class RecipesSerializerCreate(serializers.ModelSerializer):
         many=True,
         read_only=True
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         fields = (
@@ -185,50 +234,117 @@ class RecipesSerializerCreate(serializers.ModelSerializer):
             )
         return text[0].upper() + text[1:]
 
-    def validate(self, data):
+    def get_ingredients_data(self):
         ingredients_data = self.initial_data.get('ingredients')
+        if isinstance(ingredients_data, str):
+            # Multipart forms send the ingredients as a JSON string.
+            try:
+                return json.loads(ingredients_data)
+            except ValueError:
+                raise serializers.ValidationError(
+                    'Ingredients must be a JSON list.'
+                )
+        return ingredients_data
+
+    def validate(self, data):
+        ingredients_data = self.get_ingredients_data()
 
         if not ingredients_data:
             raise serializers.ValidationError(
                 'Add at least one ingredient.'
             )
 
-        ingredients_list = []
+        amounts = {}
         for ingredient in ingredients_data:
-            ingredient_id = ingredient['id']
             try:
-                int(ingredient['amount'])
-            except ValueError:
+                ingredient_id = int(ingredient['id'])
+                amount = int(ingredient['amount'])
+            except (KeyError, TypeError, ValueError):
                 raise serializers.ValidationError(
                     'The amount of ingredient can only be specified by number.'
                 )
-            if int(ingredient['amount']) <= 0:
+            if amount <= 0:
                 raise serializers.ValidationError(
                     'Specify the weight/quantity of ingredients.'
                 )
-
-            if not Ingredient.objects.filter(id=ingredient_id).exists():
-                raise serializers.ValidationError(
-                    f'No ingredient found with id={ingredient_id}!'
-                )
-            if ingredient_id in ingredients_list:
+            if ingredient_id in amounts:
                 raise serializers.ValidationError(
                     'The ingredients should not be repeated.'
                 )
-            ingredients_list.append(ingredient_id)
+            amounts[ingredient_id] = amount
+
+        ingredients = Ingredient.objects.in_bulk(amounts)
+        missing = [
+            f'No ingredient found with id={ingredient_id}!'
+            for ingredient_id in amounts
+            if ingredient_id not in ingredients
+        ]
+        if missing:
+            raise serializers.ValidationError({'ingredients': missing})
+
+        data['ingredients'] = [
+            (ingredients[ingredient_id], amount)
+            for ingredient_id, amount in amounts.items()
+        ]
         return data
 
-    def create_ingridients(self, ingredients_data, recipe):
-        for ingredient in ingredients_data:
+    def create_ingridients(self, ingredients, recipe):
+        IngredientInRecipe.objects.bulk_create(
             IngredientInRecipe(
                 recipe=recipe,
-                ingredient_id=ingredient['id'],
-                amount=ingredient.get('amount')
-            ).save()
+                ingredient=ingredient,
+                amount=amount
+            )
+            for ingredient, amount in ingredients
+        )
+
+    def update_ingredients(self, ingredients, recipe):
+        """Insert, update or delete only the rows that changed."""
+        existing = {
+            row.ingredient_id: row
+            for row in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        to_create = []
+        to_update = []
+        for ingredient, amount in ingredients:
+            row = existing.pop(ingredient.id, None)
+            if row is None:
+                to_create.append(IngredientInRecipe(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=amount
+                ))
+            elif row.amount != amount:
+                row.amount = amount
+                to_update.append(row)
+        if existing:
+            IngredientInRecipe.objects.filter(
+                id__in=[row.id for row in existing.values()]
+            ).delete()
+        if to_update:
+            IngredientInRecipe.objects.bulk_update(to_update, ('amount',))
+        if to_create:
+            IngredientInRecipe.objects.bulk_create(to_create)
+
+    def to_representation(self, recipe):
+        prefetch_related_objects(
+            [recipe], *RecipesQuerySet.related_prefetches()
+        )
+        return super().to_representation(recipe)
+
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            # Storage moves the temporary upload, close it here rather
+            # than leaving the cleanup to garbage collection.
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
 
     @transaction.atomic
     def create(self, validated_data):
-        ingredients_data = self.initial_data.get('ingredients')
+        ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
 
         recipe = Recipes.objects.create(
@@ -236,26 +352,33 @@ class RecipesSerializerCreate(serializers.ModelSerializer):
             **validated_data
         )
 
-        self.create_ingridients(ingredients_data, recipe)
+        self.create_ingridients(ingredients, recipe)
 
         recipe.tags.set(tags)
+        schedule_renditions(recipe)
         return recipe
 
     @transaction.atomic
     def update(self, recipe, validated_data):
-        recipe.ingredients.clear()
-        recipe.tags.clear()
-        ingredients_data = self.initial_data.get('ingredients')
+        ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe.tags.set(tags)
-        IngredientInRecipe.objects.filter(recipe=recipe).all().delete()
-        self.create_ingridients(ingredients_data, recipe)
-        return super().update(recipe, validated_data)
+        self.update_ingredients(ingredients, recipe)
+        image = recipe.image.name
+        recipe = super().update(recipe, validated_data)
+        # Images are named by content, so an unchanged image keeps its name.
+        if recipe.image.name != image:
+            recipe.image_renditions = {}
+            Recipes.objects.filter(pk=recipe.pk).update(image_renditions={})
+            schedule_renditions(recipe)
+        return recipe
 
 
 class ActionsSerializer(serializers.ModelSerializer):
     """Serializer for recipe management."""
 
+    image = ImageRenditionField('thumbnail')
+
     class Meta:
         fields = (
             'id',
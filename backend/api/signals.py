@@ -0,0 +1,28 @@
+from api.versions import bump_table_version
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Ingredient, Recipes, Tag
+from users.models import Subscription
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def reference_data_changed(sender, **kwargs):
+    bump_table_version(sender)
+
+
+@receiver((post_save, post_delete), sender=Recipes)
+@receiver((post_save, post_delete), sender=Subscription)
+def row_count_changed(sender, created=True, **kwargs):
+    """Invalidate cached pagination counts when rows come or go.
+
+    Favorites, carts and users change too often to take the version row
+    lock on every write; their counts wait for PAGINATION_COUNT_TIMEOUT.
+    """
+    if created:
+        bump_table_version(sender)
+
+
+@receiver(post_save, sender=Recipes)
+def update_search_vector(sender, instance, **kwargs):
+    sender.objects.filter(pk=instance.pk).update_search_vector()
@@ -0,0 +1,373 @@
+import base64
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from api.fields import RecipeImageField
+from api.pagination import RecipesPagination
+from django.core.cache import cache
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipes,
+                            Tag)
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from users.models import User
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class RecipesQueriesTest(TestCase):
+    """The recipe endpoints run a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        cls.tags = [
+            Tag.objects.create(
+                name=f'tag{i}', color=f'#00000{i}', slug=f'tag{i}'
+            )
+            for i in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ingredient{i}',
+                                      measurement_unit='g')
+            for i in range(4)
+        ]
+        cls.recipes = []
+        for i in range(8):
+            recipe = Recipes.objects.create(
+                author=cls.user,
+                name=f'Recipe {i}',
+                text='Recipe description',
+                cooking_time=10
+            )
+            recipe.tags.set(cls.tags)
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(recipe=recipe, ingredient=ingredient,
+                                   amount=i + 1)
+                for ingredient in cls.ingredients[:3]
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for page_size in (2, 8):
+            with self.subTest(page_size=page_size):
+                cache.clear()
+                with mock.patch.object(RecipesPagination, 'page_size',
+                                       page_size):
+                    with self.assertNumQueries(5):
+                        response = self.client.get('/api/recipes/')
+                self.assertEqual(len(response.data['results']), page_size)
+
+    def test_count_is_shared_between_users(self):
+        self.client.get('/api/recipes/')
+        other = User.objects.create_user(
+            username='guest', email='guest@example.com', password='password'
+        )
+        self.client.force_authenticate(other)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.data['count'], len(self.recipes))
+
+    def test_detail_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/recipes/{self.recipes[0].id}/')
+        self.assertEqual(len(response.data['ingredients']), 3)
+
+
+class FeedKeysetPaginationTest(TestCase):
+    """The cursor mode walks the feed without duplicates or gaps."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        cls.tag = Tag.objects.create(name='tag', color='#000000', slug='tag')
+        now = timezone.now()
+        cls.tagged = []
+        for i in range(20):
+            recipe = Recipes.objects.create(
+                author=cls.user,
+                name=f'Recipe {i}',
+                text='Recipe description',
+                cooking_time=10
+            )
+            # Groups of four recipes share a publication date.
+            Recipes.objects.filter(id=recipe.id).update(
+                pub_date=now - timezone.timedelta(minutes=i // 4)
+            )
+            if i % 3:
+                recipe.tags.add(cls.tag)
+                cls.tagged.append(recipe)
+
+    def test_walks_every_page(self):
+        client = APIClient()
+        url = '/api/recipes/?pagination=cursor&tags=tag'
+        seen = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        expected = Recipes.objects.filter(
+            id__in=[recipe.id for recipe in self.tagged]
+        ).order_by('-pub_date', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_search_keeps_page_numbers(self):
+        oldest, newest = self.tagged[-1], self.tagged[0]
+        Recipes.objects.filter(id=oldest.id).update(name='Borscht')
+        Recipes.objects.filter(id=newest.id).update(text='Like borscht')
+        response = APIClient().get(
+            '/api/recipes/', {'pagination': 'cursor', 'search': 'borscht'}
+        )
+        # Name matches rank first, whatever the publication date.
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [oldest.id, newest.id]
+        )
+
+    def test_invalid_cursor(self):
+        client = APIClient()
+        for cursor in ('not a cursor', 'Zm9vIGJhcg=='):
+            with self.subTest(cursor=cursor):
+                response = client.get(
+                    '/api/recipes/', {'pagination': 'cursor', 'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+def make_png(size=(8, 8)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def make_image(content=None):
+    return 'data:image/png;base64,' + base64.b64encode(
+        make_png() if content is None else content
+    ).decode()
+
+
+class RecipeImageFieldTest(SimpleTestCase):
+    """Untrusted images are rejected before their pixels are decoded."""
+
+    def assert_rejected(self, data, code):
+        with self.assertRaises(ValidationError) as context:
+            RecipeImageField().to_internal_value(data)
+        self.assertEqual(context.exception.detail[0].code, code)
+
+    def test_valid_image(self):
+        file = RecipeImageField().to_internal_value(make_image())
+        self.addCleanup(file.close)
+        self.assertTrue(file.name.endswith('.png'))
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=64)
+    def test_oversized_base64_is_not_decoded(self):
+        with mock.patch('api.fields.base64.b64decode') as b64decode:
+            self.assert_rejected(make_image(b'x' * 100), 'too_large')
+        b64decode.assert_not_called()
+
+    @override_settings(RECIPE_IMAGE_MAX_DIMENSION=4)
+    def test_too_many_pixels(self):
+        data = make_image()
+        with mock.patch.object(
+            TemporaryUploadedFile, 'close', autospec=True,
+            side_effect=TemporaryUploadedFile.close
+        ) as close:
+            with mock.patch.object(Image.Image, 'load') as load:
+                self.assert_rejected(data, 'too_many_pixels')
+        load.assert_not_called()
+        close.assert_called()
+
+    def test_invalid_base64(self):
+        self.assert_rejected('data:image/png;base64,@@@@', 'invalid_base64')
+
+    def test_not_an_image(self):
+        self.assert_rejected(make_image(b'not an image'), 'invalid_image')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipesWriteQueriesTest(TestCase):
+    """Ingredients of a recipe are written in bulk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        cls.tag = Tag.objects.create(name='tag', color='#000000', slug='tag')
+        # Not the first recipe, so the table version row already exists.
+        Recipes.objects.create(
+            author=cls.user,
+            name='Existing recipe',
+            text='Recipe description',
+            cooking_time=10
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ingredient{i}',
+                                      measurement_unit='g')
+            for i in range(6)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_data(self, ingredients):
+        return {
+            'name': 'Recipe',
+            'text': 'Recipe description',
+            'cooking_time': 10,
+            'tags': [self.tag.id],
+            'image': make_image(),
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for amount, ingredient in enumerate(ingredients, start=1)
+            ],
+        }
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        for count in (1, 5):
+            with self.subTest(ingredients=count):
+                data = self.get_data(self.ingredients[:count])
+                data['name'] = f'Recipe {count}'
+                with self.assertNumQueries(12):
+                    response = self.client.post(
+                        '/api/recipes/', data, format='json'
+                    )
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(len(response.data['ingredients']), count)
+
+    def test_update_queries_do_not_depend_on_ingredients(self):
+        response = self.client.post(
+            '/api/recipes/',
+            self.get_data(self.ingredients[:3]),
+            format='json'
+        )
+        url = f"/api/recipes/{response.data['id']}/"
+        # Changes the amount of one ingredient, removes two and adds three.
+        data = self.get_data(self.ingredients[2:])
+        with self.assertNumQueries(15):
+            response = self.client.patch(url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.data['ingredients']],
+            [ingredient.id for ingredient in self.ingredients[2:]]
+        )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeMultipartCreateTest(TestCase):
+    """Recipes can be created with a multipart upload."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        cls.tag = Tag.objects.create(name='tag', color='#000000', slug='tag')
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ingredient{i}',
+                                      measurement_unit='g')
+            for i in range(2)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_ingredients_as_json_string(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/recipes/', {
+            'name': 'Recipe',
+            'text': 'Recipe description',
+            'cooking_time': 10,
+            'tags': [self.tag.id],
+            'image': SimpleUploadedFile(
+                'image.png', make_png(), content_type='image/png'
+            ),
+            'ingredients': json.dumps([
+                {'id': ingredient.id, 'amount': 2}
+                for ingredient in self.ingredients
+            ]),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            sorted(item['id'] for item in response.data['ingredients']),
+            [ingredient.id for ingredient in self.ingredients]
+        )
+        self.assertTrue(
+            Recipes.objects.get(id=response.data['id']).image.name
+            .endswith('.png')
+        )
+
+
+class ReferenceDataETagTest(TestCase):
+    """Reference data is revalidated against the table version."""
+
+    def setUp(self):
+        self.client = APIClient()
+        Tag.objects.create(name='breakfast', color='#000000', slug='breakfast')
+
+    def test_unchanged_tags_are_not_modified(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_changed_tags_are_sent_again(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        Tag.objects.create(name='dinner', color='#000001', slug='dinner')
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+
+class PopularRecipesTest(TestCase):
+    """The popular list follows the rankings as soon as they change."""
+
+    def test_count_is_refreshed_after_rankings_update(self):
+        user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        recipe = Recipes.objects.create(
+            author=user,
+            name='Recipe',
+            text='Recipe description',
+            cooking_time=10
+        )
+        Favorite.objects.create(author=user, recipe=recipe)
+        client = APIClient()
+        self.assertEqual(client.get('/api/recipes/popular/').data['count'], 0)
+
+        call_command('update_recipe_rankings', stdout=StringIO())
+        response = client.get('/api/recipes/popular/')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['id'], recipe.id)
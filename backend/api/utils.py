@@ -1,4 +1,6 @@
-import reportlab
+import os
+from functools import lru_cache
+
 from foodgram.settings import MEDIA_ROOT, SITE_NAME
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
@@ -10,11 +12,13 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
 
 
-def pdf_generate(text, response):
-    """Generation of PDF-Files."""
+@lru_cache(maxsize=None)
+def get_pdf_styles():
+    """Register the font and build the stylesheet once per process."""
 
-    reportlab.rl_config.TTFSearchPath.append(str(MEDIA_ROOT) + '/fonts')
-    pdfmetrics.registerFont(TTFont('Open Sans', 'opensans.ttf'))
+    pdfmetrics.registerFont(
+        TTFont('Open Sans', os.path.join(MEDIA_ROOT, 'fonts', 'opensans.ttf'))
+    )
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(
         name='Top Recipe',
@@ -39,7 +43,13 @@ def pdf_generate(text, response):
         textColor=colors.silver,
         alignment=TA_LEFT)
     )
+    return styles
+
+
+def pdf_generate(text, response):
+    """Generation of PDF-Files."""
 
+    styles = get_pdf_styles()
     pdf = SimpleDocTemplate(
         response,
         title=f'List of recipes from the website: {SITE_NAME}',
@@ -0,0 +1,36 @@
+from api.models import TableVersion
+from django.db.models import F
+
+
+def _version_name(model):
+    return model._meta.label_lower
+
+
+def get_table_versions(*models):
+    """Current version stamps of the models' tables, in one query."""
+    names = [_version_name(model) for model in models]
+    versions = dict(TableVersion.objects.filter(
+        name__in=names
+    ).values_list('name', 'version'))
+    return [versions.get(name, 0) for name in names]
+
+
+def get_table_version(model):
+    """Current version stamp of the model's table."""
+    return get_table_versions(model)[0]
+
+
+def bump_table_version(model):
+    """Mark the model's table as changed.
+
+    The counter lives in the database, so every worker and management
+    command sees the change, and it commits together with the write.
+    """
+    versions = TableVersion.objects.filter(name=_version_name(model))
+    if versions.update(version=F('version') + 1):
+        return
+    _, created = TableVersion.objects.get_or_create(
+        name=_version_name(model), defaults={'version': 1}
+    )
+    if not created:
+        versions.update(version=F('version') + 1)
@@ -1,10 +1,15 @@
+from api.exports import EXPORTERS
 from api.filter import RecipesFilter
+from api.metrics import registry
 from api.mixins import ViewOnlyViewSet
+from api.pagination import RecipesPagination
 from api.permissions import IsAuthorOrAdminOrReadOnly
+from api.search import ingredient_index
 from api.serializers import (ActionsSerializer, IngredientsSerializer,
-                             RecipesSerializer, RecipesSerializerCreate,
-                             TagsSerializer)
-from api.utils import pdf_generate
+                             RecipesCoverageSerializer, RecipesSerializer,
+                             RecipesSerializerCreate, TagsSerializer)
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Sum
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
@@ -14,7 +19,6 @@ from recipes.models import (Cart, Favorite, Ingredient, IngredientInRecipe,
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
 
@@ -39,19 +43,55 @@ class IngredientsViewSet(ViewOnlyViewSet):
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(self.search, request)
+
+    def search(self, request):
+        name = request.query_params['name']
+        if request.query_params.get('fuzzy') in ('1', 'true'):
+            return Response(
+                ingredient_index.fuzzy_search(name, self.get_search_limit())
+            )
+        return Response(ingredient_index.search(name))
+
+    def get_search_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return settings.INGREDIENT_SEARCH_LIMIT
+        return max(1, min(limit, settings.INGREDIENT_SEARCH_MAX_LIMIT))
+
 
 class RecipesViewSet(viewsets.ModelViewSet):
     """Recipes model processing viewset."""
 
     queryset = Recipes.objects.all()
-    pagination_class = PageNumberPagination
+    pagination_class = RecipesPagination
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipesFilter
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve', 'popular', 'by_ingredients'):
+            return queryset.with_related().with_user_flags(
+                self.request.user
+            )
+        return queryset
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= selects the export format, not a DRF renderer.
+        if self.action == 'download_shopping_cart':
+            force = True
+        return super().perform_content_negotiation(request, force)
+
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'partial_update':
             return RecipesSerializerCreate
+        if self.action == 'by_ingredients':
+            return RecipesCoverageSerializer
         return RecipesSerializer
 
     @action(
@@ -60,6 +100,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
         url_path='shopping_cart',
         permission_classes=[permissions.IsAuthenticatedOrReadOnly],
     )
+    @transaction.atomic
     def shopping_cart(self, request, pk=None):
         user = request.user
         recipe = get_object_or_404(Recipes, id=pk)
@@ -82,6 +123,9 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 author=user,
                 recipe=recipe
             ).save()
+            Recipes.objects.filter(id=recipe.id).change_counter(
+                'carts_count', 1
+            )
             serializer = ActionsSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -92,7 +136,10 @@ class RecipesViewSet(viewsets.ModelViewSet):
             }
             return Response(error, status=status.HTTP_400_BAD_REQUEST)
 
-        cart.delete()
+        deleted, _ = cart.delete()
+        Recipes.objects.filter(id=recipe.id).change_counter(
+            'carts_count', -deleted
+        )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -101,6 +148,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
         url_path='favorite',
         permission_classes=[permissions.IsAuthenticatedOrReadOnly],
     )
+    @transaction.atomic
     def favorite(self, request, pk=None):
         user = request.user
         recipe = get_object_or_404(Recipes, id=pk)
@@ -122,6 +170,9 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 author=user,
                 recipe=recipe
             ).save()
+            Recipes.objects.filter(id=recipe.id).change_counter(
+                'favorites_count', 1
+            )
             serializer = ActionsSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -129,15 +180,65 @@ class RecipesViewSet(viewsets.ModelViewSet):
             error = {'errors': 'This recipe is not in your favorites.'}
             return Response(error, status=status.HTTP_400_BAD_REQUEST)
 
-        favorite.delete()
+        deleted, _ = favorite.delete()
+        Recipes.objects.filter(id=recipe.id).change_counter(
+            'favorites_count', -deleted
+        )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['GET'],
+    )
+    def popular(self, request):
+        """Recipes ranked by recent favorite and shopping cart activity."""
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            ranking__isnull=False
+        ).order_by('-ranking__score', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+    )
+    def by_ingredients(self, request):
+        """Recipes that can be cooked from the given ingredients."""
+        try:
+            ingredient_ids = {
+                int(ingredient_id)
+                for ingredient_id in request.query_params.get(
+                    'ingredients', ''
+                ).split(',')
+            }
+        except ValueError:
+            error = {
+                'errors': ('Pass ingredient ids separated by commas, '
+                           'for example ?ingredients=1,2,3')
+            }
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(
+            self.get_queryset()
+        ).by_ingredients(ingredient_ids)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=False,
         methods=['GET', ],
         permission_classes=[permissions.IsAuthenticatedOrReadOnly],
     )
     def download_shopping_cart(self, request):
+        export_format = request.query_params.get('format', 'pdf')
+        exporter = EXPORTERS.get(export_format)
+        if exporter is None:
+            error = {
+                'errors': ('Unsupported format. Available formats: '
+                           + ', '.join(EXPORTERS))
+            }
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
         get_cart = IngredientInRecipe.objects.filter(
             recipe__cart__author=request.user
         ).values(
@@ -145,14 +246,13 @@ class RecipesViewSet(viewsets.ModelViewSet):
             'ingredient__measurement_unit'
         ).annotate(
             Sum('amount')
-        )
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment;'
-        text_cart = ''
-        for value in get_cart:
-            text_cart += (
-                value['ingredient__name'] + ' - '
-                + str(value['amount__sum']) + ' '
-                + value['ingredient__measurement_unit'] + '<br />'
-            )
-        return pdf_generate(text_cart, response)
+        ).order_by('ingredient__name')
+        return exporter(get_cart).get_response(request)
+
+
+def metrics(request):
+    """Metrics of all workers in the Prometheus text format."""
+    return HttpResponse(
+        registry.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
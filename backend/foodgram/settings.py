@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -31,6 +32,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.RequestStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -100,6 +103,10 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DEFAULT_FILE_STORAGE = 'recipes.storage.HashedFileSystemStorage'
+
+MEDIA_ORPHAN_MIN_AGE = 60 * 60
+
 AUTH_USER_MODEL = 'users.User'
 
 EMAIL_BACKEND = os.getenv(
@@ -147,3 +154,50 @@ SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SITE_NAME = 'Foodgram-Tonkova.RU'
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+INGREDIENT_SEARCH_LIMIT = 10
+
+INGREDIENT_SEARCH_MAX_LIMIT = 50
+
+PAGINATION_COUNT_TIMEOUT = 30
+
+PAGINATION_ESTIMATE_THRESHOLD = 100000
+
+POPULAR_RECIPES_HALF_LIFE_DAYS = 7
+
+POPULAR_RECIPES_WINDOW_DAYS = 30
+
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
+RECIPE_IMAGE_MAX_DIMENSION = 6000
+
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', default=2))
+
+IMAGE_RENDITION_FORMAT = os.getenv('IMAGE_RENDITION_FORMAT', default='WEBP')
+
+REQUEST_STATS_REPEATED_QUERY_THRESHOLD = int(
+    os.getenv('REQUEST_STATS_REPEATED_QUERY_THRESHOLD', default=10)
+)
+
+METRICS_MULTIPROCESS_DIR = os.getenv('METRICS_MULTIPROCESS_DIR')
+
+METRICS_FLUSH_INTERVAL = 1
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_STATS_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}
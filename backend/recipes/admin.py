@@ -18,9 +18,15 @@ class RecipesAdmin(admin.ModelAdmin):
     list_filter = ('pub_date', 'author', 'tags')
     fields = ('name', 'text', 'tags', 'author')
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return queryset.search(search_term), False
+
     def is_favorite(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
     is_favorite.short_description = 'In favorites'
+    is_favorite.admin_order_field = 'favorites_count'
 
 
 class IngredientAdmin(admin.ModelAdmin):
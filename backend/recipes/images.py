@@ -0,0 +1,80 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='renditions'
+)
+
+
+def build_renditions(recipe_id, image_name):
+    """Resize and re-encode a recipe image, then store the renditions."""
+    from recipes.models import Recipes
+
+    image_format = settings.IMAGE_RENDITION_FORMAT
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    with default_storage.open(image_name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGB')
+
+    renditions = {}
+    for name, size in RENDITIONS.items():
+        rendition = image.copy()
+        rendition.thumbnail(size, Image.LANCZOS)
+        buffer = BytesIO()
+        rendition.save(buffer, image_format, quality=80)
+        renditions[name] = default_storage.save(
+            f'recipes/renditions/{name}.{extension}',
+            ContentFile(buffer.getvalue())
+        )
+    # The image may have been replaced while we were working.
+    Recipes.objects.filter(
+        pk=recipe_id, image=image_name
+    ).update(image_renditions=renditions)
+    return renditions
+
+
+def _run(recipe_id, image_name):
+    try:
+        build_renditions(recipe_id, image_name)
+    except Exception:
+        logger.exception('Could not build renditions of %s', image_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe):
+    """Build the renditions in the worker pool once the upload commits."""
+    if not recipe.image:
+        return
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    transaction.on_commit(
+        lambda: executor.submit(_run, recipe_id, image_name)
+    )
+
+
+def rendition_url(recipe, name, request=None):
+    """URL of a rendition, or of the original until it is ready."""
+    if not recipe.image:
+        return None
+    path = (recipe.image_renditions or {}).get(name)
+    url = default_storage.url(path) if path else recipe.image.url
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
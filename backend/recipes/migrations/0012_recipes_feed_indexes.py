@@ -0,0 +1,26 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_ingredient_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipes',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Recipe publication date'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipes_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['author', '-pub_date'], name='recipes_author_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:15
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipes = apps.get_model('recipes', 'Recipes')
+    for model_name, field in (('Favorite', 'favorites_count'),
+                              ('Cart', 'carts_count')):
+        model = apps.get_model('recipes', model_name)
+        totals = model.objects.filter(
+            recipe=models.OuterRef('pk')
+        ).values('recipe').annotate(
+            total=models.Count('id')
+        ).values('total')
+        Recipes.objects.update(
+            **{field: Coalesce(models.Subquery(totals), 0)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipes_feed_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Added to shopping carts'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Added to favorites'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipes_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRanking',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.recipes', verbose_name='Recipe')),
+                ('score', models.FloatField(default=0, verbose_name='Score')),
+                ('computed_at', models.DateTimeField(verbose_name='Computed at')),
+            ],
+            options={
+                'verbose_name': 'Recipe ranking',
+                'verbose_name_plural': 'Recipe rankings',
+                'ordering': ('-score',),
+            },
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Added'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Added'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='reciperanking',
+            index=models.Index(fields=['-score'], name='recipes_ranking_score_idx'),
+        ),
+    ]
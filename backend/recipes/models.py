@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField)
 from django.core.validators import (MaxLengthValidator, MaxValueValidator,
                                     MinValueValidator, RegexValidator)
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import Coalesce
 
 
 User = get_user_model()
@@ -71,6 +74,106 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipesQuerySet(models.QuerySet):
+    """Recipe queryset with the preloading used by the API."""
+
+    @staticmethod
+    def related_prefetches():
+        return (
+            'tags',
+            models.Prefetch(
+                'ingredientinrecipe_set',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+
+    def with_related(self):
+        """Load author, tags and ingredient rows in a fixed query count."""
+        return self.select_related('author').prefetch_related(
+            *self.related_prefetches()
+        )
+
+    def change_counter(self, field, delta):
+        """Atomically add delta to a counter column, never below zero."""
+        queryset = self
+        if delta < 0:
+            queryset = self.filter(**{f'{field}__gte': -delta})
+        return queryset.update(**{field: models.F(field) + delta})
+
+    def search(self, value):
+        """Full-text search over name and text, best matches first."""
+        if connections[self.db].vendor == 'postgresql':
+            query = SearchQuery(
+                value, config='russian', search_type='websearch'
+            )
+            return self.filter(search_vector=query).annotate(
+                search_rank=SearchRank(models.F('search_vector'), query)
+            ).order_by('-search_rank', '-pub_date', '-id')
+        return self.filter(
+            models.Q(name__icontains=value) | models.Q(text__icontains=value)
+        ).annotate(
+            search_rank=models.Case(
+                models.When(name__icontains=value, then=1),
+                default=0,
+                output_field=models.IntegerField()
+            )
+        ).order_by('-search_rank', '-pub_date', '-id')
+
+    def update_search_vector(self):
+        """Recompute the search vector; a no-op outside PostgreSQL."""
+        if connections[self.db].vendor != 'postgresql':
+            return 0
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config='russian')
+            + SearchVector(
+                Coalesce('text', models.Value('')),
+                weight='B',
+                config='russian'
+            )
+        ))
+
+    def by_ingredients(self, ingredient_ids):
+        """Recipes using the ingredients, by the share of them available.
+
+        Annotates coverage (available / all ingredient rows of the recipe)
+        and missing_count; ties in coverage go to fewer missing rows.
+        """
+        available = models.Count(
+            'ingredientinrecipe',
+            filter=models.Q(ingredientinrecipe__ingredient__in=ingredient_ids),
+            distinct=True
+        )
+        total = models.Count('ingredientinrecipe', distinct=True)
+        return self.filter(
+            id__in=IngredientInRecipe.objects.filter(
+                ingredient__in=ingredient_ids
+            ).values('recipe')
+        ).annotate(
+            coverage=models.ExpressionWrapper(
+                available * 1.0 / total,
+                output_field=models.FloatField()
+            ),
+            missing_count=total - available
+        ).order_by('-coverage', 'missing_count', '-pub_date', '-id')
+
+    def with_user_flags(self, user):
+        """Annotate is_favorited and is_in_shopping_cart for the user."""
+        if user.is_anonymous:
+            return self
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                author=user,
+                recipe=models.OuterRef('pk')
+            )),
+            is_in_shopping_cart=models.Exists(Cart.objects.filter(
+                author=user,
+                recipe=models.OuterRef('pk')
+            ))
+        )
+
+
 class Recipes(models.Model):
     """Prescription list table model."""
 
@@ -84,6 +187,12 @@ class Recipes(models.Model):
         null=True,
         blank=True
     )
+    image_renditions = models.JSONField(
+        'Image renditions',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     ingredients = models.ManyToManyField(
         to=Ingredient,
         verbose_name='Ingredients',
@@ -121,11 +230,26 @@ class Recipes(models.Model):
     pub_date = models.DateTimeField(
         'Recipe publication date',
         auto_now_add=True,
-        db_index=True
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Added to favorites',
+        default=0,
+        editable=False,
+    )
+    carts_count = models.PositiveIntegerField(
+        'Added to shopping carts',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipesQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
         constraints = (
@@ -134,6 +258,16 @@ class Recipes(models.Model):
                 name='unique_recipes',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipes_feed_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipes_author_feed_idx',
+            ),
+        )
 
     def display_tag(self):
         return ', '.join(tags.name for tags in self.tags.all()[:3])
@@ -191,6 +325,11 @@ class Favorite(models.Model):
         verbose_name='Recipe',
         on_delete=models.CASCADE
     )
+    created = models.DateTimeField(
+        'Added',
+        auto_now_add=True,
+        db_index=True,
+    )
 
     class Meta:
         constraints = (
@@ -219,6 +358,11 @@ class Cart(models.Model):
         verbose_name='Recipe',
         on_delete=models.CASCADE
     )
+    created = models.DateTimeField(
+        'Added',
+        auto_now_add=True,
+        db_index=True,
+    )
 
     class Meta:
         constraints = (
@@ -230,3 +374,28 @@ class Cart(models.Model):
 
     def __str__(self):
         return f'{self.author.username}: {self.recipe.name}'
+
+
+class RecipeRanking(models.Model):
+    """Precomputed popularity score of a recipe."""
+
+    recipe = models.OneToOneField(
+        Recipes,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Recipe',
+        on_delete=models.CASCADE
+    )
+    score = models.FloatField('Score', default=0)
+    computed_at = models.DateTimeField('Computed at')
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Recipe ranking'
+        verbose_name_plural = 'Recipe rankings'
+        indexes = (
+            models.Index(fields=('-score',), name='recipes_ranking_score_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.score:.2f}'
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from recipes.models import Cart, Favorite, Recipes
+from recipes.storage import HashedFileSystemStorage
+
+from users.models import User
+
+
+class FeedIndexesTest(TestCase):
+    """Feed queries and the favorite and cart filters use indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        for i in range(10):
+            recipe = Recipes.objects.create(
+                author=cls.user,
+                name=f'Recipe {i}',
+                text='Recipe description',
+                cooking_time=10
+            )
+            if i % 2:
+                Favorite.objects.create(author=cls.user, recipe=recipe)
+                Cart.objects.create(author=cls.user, recipe=recipe)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are cheaper to scan than to look up.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assert_uses_index(self, queryset, *names):
+        plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in names),
+            f'None of {names} is used by:\n{plan}'
+        )
+
+    def test_feed(self):
+        self.assert_uses_index(Recipes.objects.all()[:6], 'recipes_feed_idx')
+
+    def test_author_feed(self):
+        self.assert_uses_index(
+            Recipes.objects.filter(author=self.user)[:6],
+            'recipes_author_feed_idx'
+        )
+
+    def test_favorite_filter(self):
+        self.assert_uses_index(
+            Recipes.objects.filter(favorite__author=self.user)[:6],
+            'unique_favorite',
+            'sqlite_autoindex_recipes_favorite_1',
+            'recipes_favorite_author_id_'
+        )
+
+    def test_cart_filter(self):
+        self.assert_uses_index(
+            Recipes.objects.filter(cart__author=self.user)[:6],
+            'unique_cart',
+            'sqlite_autoindex_recipes_cart_1',
+            'recipes_cart_author_id_'
+        )
+
+
+class HashedFileSystemStorageTest(SimpleTestCase):
+    """Files are stored once under the hash of their content."""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = HashedFileSystemStorage(location=self.location)
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save('recipes/a.png', ContentFile(b'image'))
+        second = self.storage.save('recipes/b.PNG', ContentFile(b'image'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.endswith('.png'))
+        self.assertEqual(len(self.storage.listdir('recipes')[1]), 1)
+
+    def test_saving_again_refreshes_the_modification_time(self):
+        name = self.storage.save('recipes/a.png', ContentFile(b'image'))
+        os.utime(self.storage.path(name), (0, 0))
+        self.storage.save('recipes/b.png', ContentFile(b'image'))
+        self.assertGreater(os.path.getmtime(self.storage.path(name)), 0)
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+def remove_duplicate_subscriptions(apps, schema_editor):
+    Subscription = apps.get_model('users', 'Subscription')
+    duplicates = Subscription.objects.values(
+        'user', 'following'
+    ).annotate(
+        first_id=models.Min('id'),
+        total=models.Count('id')
+    ).filter(total__gt=1)
+    for row in duplicates:
+        Subscription.objects.filter(
+            user=row['user'],
+            following=row['following']
+        ).exclude(id=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_rename_subscriptions_subscription'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_subscriptions,
+            migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('user', 'following'), name='unique_subscription_user'),
+        ),
+    ]
@@ -66,7 +66,9 @@ class Subscription(models.Model):
     )
 
     class Meta:
-        models.UniqueConstraint(
-            fields=('user', 'following'),
-            name='unique_subscription_user'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'following'),
+                name='unique_subscription_user'
+            ),
         )
@@ -12,13 +12,20 @@ class UserShowSerializer(serializers.ModelSerializer):
     last_name = serializers.CharField(max_length=150, required=True)
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
+    def get_followed_ids(self):
+        """Ids of users followed by the requester, loaded once a request."""
+        request = self.context["request"]
+        if not hasattr(request, 'followed_ids'):
+            request.followed_ids = (
+                set() if request.user.is_anonymous
+                else set(Subscription.objects.filter(
+                    user=request.user
+                ).values_list('following_id', flat=True))
+            )
+        return request.followed_ids
+
     def get_is_subscribed(self, username):
-        user = self.context["request"].user
-        return (not user.is_anonymous
-                and Subscription.objects.filter(
-                    user=user,
-                    following=username
-                ).exists())
+        return username.id in self.get_followed_ids()
 
     class Meta:
         model = User
@@ -139,6 +146,7 @@ class SubShowSerializer(UserShowSerializer):
     last_name = serializers.ReadOnlyField(source='following.last_name')
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -150,16 +158,31 @@ class SubShowSerializer(UserShowSerializer):
             'last_name',
             'is_subscribed',
             'recipes',
+            'recipes_count',
         )
 
+    @staticmethod
+    def get_recipes_limit(request):
+        """Number of recipes to show per author, 3 by default."""
+        try:
+            return max(0, int(request.query_params['recipes_limit']))
+        except (KeyError, ValueError):
+            return 3
+
     def get_is_subscribed(self, username):
         """If we request this method, we are subscribed to user"""
         return True
 
     def get_recipes(self, data):
         """Getting user recipes."""
-        limit = self.context.get('request').query_params.get('recipes_limit')
-        if not limit:
-            limit = 3
-        recipes = data.following.recipes.all()[:int(limit)]
-        return RecipeSmallSerializer(recipes, many=True).data
+        limit = self.get_recipes_limit(self.context.get('request'))
+        recipes = getattr(data.following, 'feed_recipes', None)
+        if recipes is None:
+            recipes = data.following.recipes.all()
+        return RecipeSmallSerializer(recipes[:limit], many=True).data
+
+    def get_recipes_count(self, data):
+        recipes_count = getattr(data, 'recipes_count', None)
+        if recipes_count is None:
+            return data.following.recipes.count()
+        return recipes_count
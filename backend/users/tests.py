@@ -0,0 +1,85 @@
+from unittest import mock
+
+from api.pagination import CachedCountPagination
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import Recipes
+from rest_framework.test import APIClient
+
+from users.models import Subscription, User
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='password',
+        first_name=username,
+        last_name=username
+    )
+
+
+class UsersQueriesTest(TestCase):
+    """User lists run a fixed number of queries whatever their size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [create_user(f'author{i}') for i in range(5)]
+        for author in cls.authors:
+            Recipes.objects.bulk_create(
+                Recipes(
+                    author=author,
+                    name=f'Recipe {i}',
+                    text='Recipe description',
+                    cooking_time=10
+                )
+                for i in range(4)
+            )
+        cls.followers = {}
+        for count in (1, len(cls.authors)):
+            follower = create_user(f'follower{count}')
+            Subscription.objects.bulk_create(
+                Subscription(user=follower, following=author)
+                for author in cls.authors[:count]
+            )
+            cls.followers[count] = follower
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_subscriptions_queries(self):
+        for count, follower in self.followers.items():
+            self.client.force_authenticate(follower)
+            for limit, shown in (('', 3), ('0', 0), ('2', 2), ('10', 4)):
+                with self.subTest(authors=count, recipes_limit=limit):
+                    cache.clear()
+                    # No recipes to prefetch with recipes_limit=0.
+                    with self.assertNumQueries(4 if shown else 3):
+                        response = self.client.get(
+                            '/api/users/subscriptions/',
+                            {'recipes_limit': limit} if limit else {}
+                        )
+                    self.assertEqual(len(response.data['results']), count)
+                    for author in response.data['results']:
+                        self.assertTrue(author['is_subscribed'])
+                        self.assertEqual(len(author['recipes']), shown)
+                        self.assertEqual(author['recipes_count'], 4)
+
+    def test_users_queries(self):
+        follower = self.followers[len(self.authors)]
+        self.client.force_authenticate(follower)
+        for page_size in (1, 7):
+            with self.subTest(users=page_size):
+                cache.clear()
+                with mock.patch.object(CachedCountPagination, 'page_size',
+                                       page_size):
+                    with self.assertNumQueries(4):
+                        response = self.client.get('/api/users/')
+                users = response.data['results']
+                self.assertEqual(len(users), page_size)
+                for user in users:
+                    self.assertEqual(
+                        user['is_subscribed'],
+                        user['id'] in {author.id for author in self.authors}
+                    )
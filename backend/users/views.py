@@ -1,9 +1,11 @@
+from api.pagination import CachedCountPagination
+from django.db.models import (Count, OuterRef, Prefetch, Subquery,
+                              prefetch_related_objects)
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
-from recipes.models import User
+from recipes.models import Recipes, User
 from rest_framework import permissions, status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from users.models import Subscription
 from users.serializers import SubShowSerializer
@@ -13,7 +15,7 @@ class CustomUserViewSet(UserViewSet):
     """Customized user viewset."""
 
     queryset = User.objects.all()
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
 
     @action(
         detail=True,
@@ -60,7 +62,30 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         pages = self.paginate_queryset(
-            Subscription.objects.filter(user=request.user)
+            Subscription.objects.filter(
+                user=request.user
+            ).select_related(
+                'following'
+            ).annotate(
+                recipes_count=Count('following__recipes')
+            ).order_by('id')
+        )
+        # Latest recipes of every author on the page in a single query.
+        limit = SubShowSerializer.get_recipes_limit(request)
+        latest_recipes = Recipes.objects.filter(
+            id__in=Subquery(
+                Recipes.objects.filter(
+                    author=OuterRef('author')
+                ).values('id')[:limit]
+            )
+        )
+        prefetch_related_objects(
+            [subscription.following for subscription in pages],
+            Prefetch(
+                'recipes',
+                queryset=latest_recipes,
+                to_attr='feed_recipes'
+            )
         )
 
         serializer = SubShowSerializer(